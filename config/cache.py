@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import os
+from collections.abc import Mapping
+from decimal import Decimal
+from functools import lru_cache, wraps
+import orjson
+from fastapi import Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi_cache import Coder, FastAPICache
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+CACHE_PREFIX = "ger"
+
+# Cache lifetimes (seconds) grouped by how often the underlying data changes
+SHORT_EXPIRE = 30       # customers, sales
+LONG_EXPIRE = 3600      # products, stores, exchange rates
+
+# How long clients and proxies may reuse a response without revalidating
+SHORT_MAX_AGE = 30      # customers, sales
+LONG_MAX_AGE = 300      # products, stores, exchange rates
+
+
+def _orjson_default(value):
+    if isinstance(value, Mapping):
+        return dict(value)
+    # Kept as a string so cached prices keep their scale, e.g. "12.9900"
+    if isinstance(value, Decimal):
+        return str(value)
+    return jsonable_encoder(value)
+
+
+class OrjsonCoder(Coder):
+    # Default coder for cached responses: orjson instead of the stdlib json
+    # module used by fastapi-cache's JsonCoder
+    @classmethod
+    def encode(cls, value):
+        return orjson.dumps(value, default=_orjson_default)
+
+    @classmethod
+    def decode(cls, value):
+        return orjson.loads(value)
+
+
+@lru_cache
+def model_coder(response_model):
+    # Coder for detail endpoints: stores the response model's JSON dump, i.e.
+    # the body the route sends, rather than the ORM object it returns, so a
+    # cache hit never has to unpickle anything read back from Redis. Hits are
+    # validated back into the response model, as table models do not coerce
+    # plain JSON values when FastAPI serializes them.
+    class ModelCoder(OrjsonCoder):
+        @classmethod
+        def encode(cls, value):
+            return orjson.dumps(response_model.model_validate(value).model_dump(mode="json"))
+
+        @classmethod
+        def decode(cls, value):
+            return response_model.model_validate(orjson.loads(value))
+
+    return ModelCoder
+
+
+def request_key_builder(func, namespace="", *, request=None, response=None, args=(), kwargs=None):
+    # Build the key from the URL only, so injected objects such as the
+    # database session never end up in it
+    query = sorted(request.query_params.items()) if request else []
+    path = request.url.path if request else func.__name__
+    return f"{namespace}:{path}:{query}"
+
+
+async def invalidate(namespace):
+    # A cache outage must not fail a write that has already been committed
+    try:
+        await FastAPICache.clear(namespace=namespace)
+    except Exception:
+        logger.warning(f"Error clearing cache namespace '{namespace}'", exc_info=True)
+
+
+def _find_kwarg(kwargs, kind):
+    return next((value for value in kwargs.values() if isinstance(value, kind)), None)
+
+
+def cache_control(max_age):
+    # Sets the client Cache-Control on a list endpoint. It goes above @cache,
+    # whose own header advertises the server-side expiry (up to an hour) and
+    # would let browsers and proxies keep a list long after a write has
+    # cleared it from Redis.
+    def wrapper(func):
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            response = _find_kwarg(kwargs, Response)
+
+            result = await func(*args, **kwargs)
+            # @cache answers a matching If-None-Match with the response itself
+            target = result if isinstance(result, Response) else response
+            if target is not None:
+                target.headers["Cache-Control"] = f"public, max-age={max_age}"
+            return result
+
+        return inner
+
+    return wrapper
+
+
+def http_cache(response_model, max_age):
+    # Sets Cache-Control and a strong, content-based ETag on a detail endpoint
+    # and answers a matching If-None-Match with 304 Not Modified. It goes above
+    # @cache, whose own headers it replaces: those use a weak ETag derived from
+    # hash(), which differs between worker processes. The ETag is computed from
+    # the route's response_model, i.e. the body actually sent, which may hold
+    # more than the returned object's own columns (e.g. a sale's related rows).
+    def wrapper(func):
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            request = _find_kwarg(kwargs, Request)
+            response = _find_kwarg(kwargs, Response)
+
+            result = await func(*args, **kwargs)
+            if isinstance(result, Response):
+                return result
+
+            # Returned in place of the ORM object, so cache misses and hits
+            # send the same fields in the same order
+            result = response_model.model_validate(result)
+            body = orjson.dumps(result.model_dump(mode="json"), option=orjson.OPT_SORT_KEYS)
+            digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+            headers = {"Cache-Control": f"public, max-age={max_age}", "ETag": f'"{digest}"'}
+
+            if_none_match = request.headers.get("if-none-match", "") if request else ""
+            if headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")]:
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            if response is not None:
+                response.headers.update(headers)
+            return result
+
+        return inner
+
+    return wrapper
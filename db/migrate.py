@@ -0,0 +1,115 @@
+"""
+Brings the bundled SQLite database in line with the schema declared in db/models.py.
+
+Each migration step is applied once, in order, and the schema version reached
+is recorded in PRAGMA user_version, so the script can be re-run safely.
+
+Run from the project root:
+
+    python -m db.migrate
+"""
+import re
+import sqlite3
+from datetime import datetime
+
+from config.env import DATABASE_FOLDER, DATABASE_NAME
+
+
+def iso_date(value):
+    try:
+        return datetime.strptime(value, "%m/%d/%Y").date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# table -> {column: (new declared type, converter)}
+COLUMN_CHANGES = {
+    "Customer": {"Birthday": ("DATE", "iso_date")},
+    "Product": {"SubcategoryKey": ("INTEGER", "to_int"), "CategoryKey": ("INTEGER", "to_int")},
+    "Sale": {"OrderDate": ("DATE", "iso_date"), "DeliveryDate": ("DATE", "iso_date")},
+    "Store": {"OpenDate": ("DATE", "iso_date")},
+    "ExchangeRate": {"Date": ("DATE", "iso_date")},
+}
+
+
+def rebuild_table(connection, table, changes):
+    create_sql = connection.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()[0]
+    columns = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+
+    new_sql = create_sql.replace(f"CREATE TABLE {table}", f"CREATE TABLE _new_{table}", 1)
+    for column, (new_type, _) in changes.items():
+        new_sql = re.sub(rf"(\b{column}\s+)\w+", rf"\g<1>{new_type}", new_sql, count=1)
+
+    select_list = ", ".join(
+        f"{changes[column][1]}({column})" if column in changes else column for column in columns
+    )
+    connection.execute(new_sql)
+    connection.execute(f"INSERT INTO _new_{table} ({', '.join(columns)}) SELECT {select_list} FROM {table}")
+    connection.execute(f"DROP TABLE {table}")
+    connection.execute(f"ALTER TABLE _new_{table} RENAME TO {table}")
+
+
+# Dates were stored as M/D/YYYY text and category keys as TEXT, which neither
+# sort nor index as dates/numbers. SQLite cannot change a column's type in
+# place, so each affected table is rebuilt with the new declared types and its
+# rows copied over. Values that cannot be converted are stored as NULL, so the
+# converted columns are declared Optional in db/models.py.
+def fix_column_types(connection):
+    for table, changes in COLUMN_CHANGES.items():
+        rebuild_table(connection, table, changes)
+    connection.execute("CREATE INDEX IF NOT EXISTS ix_sales_orderdate ON Sale (OrderDate)")
+
+
+# The (Date, Currency) primary key cannot serve lookups by currency alone
+def add_exchange_rate_currency_index(connection):
+    connection.execute("CREATE INDEX IF NOT EXISTS ix_xr_currency_date ON ExchangeRate (Currency, Date)")
+
+
+# Schema version reached after each step
+MIGRATIONS = [
+    (1, fix_column_types),
+    (2, add_exchange_rate_currency_index),
+]
+
+
+def migrate(database_path):
+    # Autocommit mode, so each step runs in its own explicit transaction
+    connection = sqlite3.connect(database_path, isolation_level=None)
+    try:
+        current_version = connection.execute("PRAGMA user_version").fetchone()[0]
+        pending = [(version, step) for version, step in MIGRATIONS if version > current_version]
+        if not pending:
+            print("Database is already up to date")
+            return
+
+        connection.create_function("iso_date", 1, iso_date, deterministic=True)
+        connection.create_function("to_int", 1, to_int, deterministic=True)
+        connection.execute("PRAGMA foreign_keys = OFF")
+
+        for version, step in pending:
+            connection.execute("BEGIN")
+            try:
+                step(connection)
+                connection.execute(f"PRAGMA user_version = {version}")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            print(f"Migrated {database_path} to schema version {version}")
+
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    migrate(f"{DATABASE_FOLDER}/{DATABASE_NAME}")
@@ -1,5 +1,20 @@
-from typing import Optional
-from sqlmodel import Field, SQLModel
+from datetime import date
+from decimal import Decimal
+from typing import Generic, Optional, TypeVar
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import Index
+from sqlmodel import Field, Relationship, SQLModel
+
+T = TypeVar("T")
+
+# Paginated envelope returned by the list endpoints. Like the SQLModel
+# classes below, it reads attributes directly, so ORM objects and result
+# rows are validated once without being dumped to dicts first
+class Page(BaseModel, Generic[T]):
+    model_config = ConfigDict(from_attributes=True)
+
+    data: list[T]
+    count: int
 
 class Customer(SQLModel, table=True):
     CustomerKey: int = Field(primary_key=True)
@@ -11,32 +26,60 @@ class Customer(SQLModel, table=True):
     ZipCode: str
     Country: str
     Continent: str
-    Birthday: str
+    Birthday: Optional[date] = None
+
+class CustomerListItem(SQLModel):
+    CustomerKey: int
+    Name: str
+    City: str
+    Country: str
 
 class Product(SQLModel, table=True):
     ProductKey : int = Field(primary_key=True)
     ProductName : str
     Brand : str
     Color : str
-    UnitCostUSD : bool
-    UnitPriceUSD : bool
-    SubcategoryKey : str
+    UnitCostUSD : Decimal = Field(max_digits=12, decimal_places=4)
+    UnitPriceUSD : Decimal = Field(max_digits=12, decimal_places=4)
+    SubcategoryKey : Optional[int] = None
     Subcategory : str
-    CategoryKey : str
+    CategoryKey : Optional[int] = None
     Category : str
 
+class ProductListItem(SQLModel):
+    ProductKey : int
+    ProductName : str
+    Brand : str
+    Category : str
+    UnitPriceUSD : Decimal
 
 class Sale(SQLModel, table=True):
+    __table_args__ = (Index("ix_sales_orderdate", "OrderDate"),)
+
+    # An order has one row per line item, so both columns form the key
     OrderNumber: int = Field(primary_key=True)
+    LineItem : int = Field(primary_key=True)
+    OrderDate : Optional[date] = None
+    DeliveryDate : Optional[date] = None
+    CustomerKey : int = Field(foreign_key="customer.CustomerKey")
+    StoreKey : int = Field(foreign_key="store.StoreKey")
+    ProductKey : int = Field(foreign_key="product.ProductKey")
+    Quantity : int
+    CurrencyCode : str
+
+    # Never lazy-loaded: handlers that need them must load them eagerly
+    customer : Optional[Customer] = Relationship(sa_relationship_kwargs={"lazy": "raise"})
+    product : Optional[Product] = Relationship(sa_relationship_kwargs={"lazy": "raise"})
+    store : Optional["Store"] = Relationship(sa_relationship_kwargs={"lazy": "raise"})
+
+class SaleListItem(SQLModel):
+    # Two placeholder rows in the bundled database have no order number
+    OrderNumber : Optional[int] = None
     LineItem : int
-    OrderDate : str
-    DeliveryDate : str
+    OrderDate : Optional[date] = None
     CustomerKey : int
-    StoreKey : int
     ProductKey : int
     Quantity : int
-    CurrencyCode : str
-
 
 
 class Store(SQLModel, table=True):
@@ -44,9 +87,36 @@ class Store(SQLModel, table=True):
     Country : str
     State : str
     SquareMeters : int
-    OpenDate : str
+    OpenDate : Optional[date] = None
+
+class StoreListItem(SQLModel):
+    StoreKey : int
+    Country : str
+    State : str
+
+# Sale returned together with the customer, product and store it refers to
+class SaleDetails(SQLModel):
+    OrderNumber : int
+    LineItem : int
+    OrderDate : Optional[date] = None
+    DeliveryDate : Optional[date] = None
+    CustomerKey : int
+    StoreKey : int
+    ProductKey : int
+    Quantity : int
+    CurrencyCode : str
+    customer : Optional[CustomerListItem] = None
+    product : Optional[ProductListItem] = None
+    store : Optional[StoreListItem] = None
 
 class ExchangeRate(SQLModel, table=True):
-    Date : str = Field(primary_key=True)
+    __table_args__ = (Index("ix_xr_currency_date", "Currency", "Date"),)
+
+    Date : date = Field(primary_key=True)
     Currency : str = Field(primary_key=True)
-    Exchange : bool
\ No newline at end of file
+    Exchange : float
+
+class ExchangeRateListItem(SQLModel):
+    Date : date
+    Currency : str
+    Exchange : float
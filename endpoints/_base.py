@@ -0,0 +1,44 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import ORJSONResponse
+
+from config.env import get_session
+from sqlalchemy import inspect, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Dependency injection for database session
+DatabaseSession = Annotated[AsyncSession, Depends(get_session)]
+
+# Responses documented on every router
+COMMON_RESPONSES = {
+    status.HTTP_201_CREATED: {"description": "Successfully created the requested resource"},
+    status.HTTP_404_NOT_FOUND: {"description": "Resource not found"},
+    status.HTTP_500_INTERNAL_SERVER_ERROR: {"description": "An error occurred on the server"},
+}
+
+
+# Setting up an API router mounted under /<name> with the shared configuration
+def make_router(name, tag):
+    return APIRouter(
+        prefix=f"/{name}",
+        tags=[tag],
+        responses=COMMON_RESPONSES,
+        default_response_class=ORJSONResponse,
+    )
+
+
+# Updates the row with the given primary key and returns it in the same
+# round-trip (UPDATE ... RETURNING), or None if it does not exist. The key is
+# given like session.get's (a tuple for composite keys) and every primary key
+# column is matched, so the statement can never touch more than one row.
+async def update_returning(session, model, ident, values):
+    if not values:
+        return await session.get(model, ident)
+    key_columns = inspect(model).primary_key
+    key_values = ident if isinstance(ident, tuple) else (ident,)
+    if len(key_values) != len(key_columns):
+        raise ValueError(f"{model.__name__} is keyed by {len(key_columns)} columns, got {len(key_values)} values")
+    criteria = [column == value for column, value in zip(key_columns, key_values)]
+    update_query = update(model).where(*criteria).values(**values).returning(model)
+    result_set = await session.exec(update_query)
+    return result_set.scalars().one_or_none()
@@ -1,115 +1,137 @@
 from typing import Annotated
-from fastapi import APIRouter, HTTPException, status, Response, Depends, Query, Path
+from fastapi import HTTPException, status, Response, Query, Path
 
-from config.env import get_session
-from db.models import Customer
-from sqlmodel import Session, select
+from config.cache import SHORT_EXPIRE, SHORT_MAX_AGE, cache_control, http_cache, invalidate, model_coder
+from db.models import Customer, CustomerListItem, Page
+from endpoints._base import DatabaseSession, make_router, update_returning
+from endpoints.validation import validate_body, validate_partial
+from fastapi_cache.decorator import cache
+from sqlalchemy import insert, lambda_stmt
+from sqlalchemy.orm import raiseload
+from sqlmodel import select
 
-# Dependency injection for database session
-DatabaseSession = Annotated[Session, Depends(get_session)]
-
-# Setting up the API router with prefixes and status codes
-router = APIRouter(
-    prefix="/customers",
-    tags=["Customers"],
-    responses={
-        status.HTTP_201_CREATED: {"description": "Successfully created the requested resource"},
-        status.HTTP_404_NOT_FOUND: {"description": "Resource not found"},
-        status.HTTP_500_INTERNAL_SERVER_ERROR: {"description": "An error occurred on the server"},
-    },
-)
+# Setting up the API router
+router = make_router("customers", "Customers")
 
 # ------ CRUD Operations ------
 
 # ------ Create a new customer record ------
 @router.post("/", response_model=Customer, summary="Add a new customer entry to the database")
-def add_customer(customer: Customer, session: DatabaseSession):
+async def add_customer(customer: Customer, session: DatabaseSession):
+    customer = validate_body(Customer, customer)
     try:
         session.add(customer)
-        session.commit()
-        session.refresh(customer)
+        await session.commit()
+        await invalidate("customers")
         return customer
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Error occurred: {error}")
 
 
+# ------ Create customer records in bulk ------
+@router.post("/bulk", response_model=dict, summary="Add several customer entries to the database in a single transaction")
+async def add_customers_bulk(customers: list[Customer], session: DatabaseSession):
+    if not customers:
+        return {"inserted": 0}
+    rows = [validate_body(Customer, customer).model_dump() for customer in customers]
+    try:
+        async with session.begin():
+            await session.exec(insert(Customer), params=rows)
+        await invalidate("customers")
+        return {"inserted": len(customers)}
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Error occurred: {error}")
+
+
 # ------ Retrieve customer records ------
 
+# List query built once as a cached lambda statement; each request only
+# binds its offset and limit into it
+_list_customers_query = lambda_stmt(
+    lambda: select(
+        Customer.CustomerKey, Customer.Name, Customer.City, Customer.Country
+    ).options(raiseload("*"))
+)
+
 # Fetch a list of customer records
-@router.get("/", response_model=dict, summary="Retrieve a list of customers")
-def list_customers(
+@router.get("/", response_model=Page[CustomerListItem], summary="Retrieve a list of customers")
+@cache_control(max_age=SHORT_MAX_AGE)
+@cache(expire=SHORT_EXPIRE, namespace="customers")
+async def list_customers(
     session: DatabaseSession,
     response: Response,
     offset: Annotated[int, Query(description="Number of records to skip")] = 0,
-    limit: Annotated[int, Query(le=10, description="Maximum number of records to fetch")] = 5,
+    limit: Annotated[int, Query(le=100, description="Maximum number of records to fetch")] = 5,
 ):
-    customer_query = select(Customer).offset(offset).limit(limit)
-    result_set = session.exec(customer_query)
-    customer_list = result_set.all()
+    customer_query = _list_customers_query + (lambda query: query.offset(offset).limit(limit))
+    result_set = await session.exec(customer_query)
+    customer_list = result_set.mappings().all()
     
     return {"data": customer_list, "count": len(customer_list)}
 
 # Retrieve details of a specific customer by ID
 @router.get("/{customer_id}", response_model=Customer, summary="Retrieve details of a customer using their ID")
-def fetch_customer_by_id(
+@http_cache(Customer, max_age=SHORT_MAX_AGE)
+@cache(expire=SHORT_EXPIRE, namespace="customers", coder=model_coder(Customer))
+async def fetch_customer_by_id(
     session: DatabaseSession,
-    customer_id: Annotated[str, Path(description="Unique identifier of the customer")],
+    customer_id: Annotated[int, Path(description="Unique identifier of the customer")],
     response: Response,
 ):
-    response.headers["Cache-Control"] = "no-cache"
-    
-    customer_query = select(Customer).where(Customer.CustomerKey == customer_id)
-    result_set = session.exec(customer_query)
-    customer_details = result_set.fetchall()
+    customer_details = await session.get(Customer, customer_id)
     
-    if not customer_details:
+    if customer_details is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"Customer with ID {customer_id} not found"
         )
     
-    return customer_details[0].model_dump()
+    return customer_details
 
 
 # ------ Update customer records ------
 
 # Full update of a customer's information
 @router.put("/{customer_id}", response_model=Customer, status_code=status.HTTP_200_OK)
-def modify_customer(
+async def modify_customer(
     session: DatabaseSession,
-    customer_id: Annotated[str, Path(description="ID of the customer to update")],
+    customer_id: Annotated[int, Path(description="ID of the customer to update")],
     customer: Customer,
 ):
-    existing_customer = session.get(Customer, customer_id)
-    if not existing_customer:
+    updated_data = validate_body(Customer, customer).model_dump()
+    updated_customer = await update_returning(
+        session, Customer, customer_id, updated_data
+    )
+    if updated_customer is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"Customer with ID {customer_id} not found"
         )
     
-    updated_data = customer.model_dump()
-    existing_customer.sqlmodel_update(updated_data)
-    session.add(existing_customer)
-    session.commit()
-    session.refresh(existing_customer)
+    await session.commit()
+    await invalidate("customers")
+    # Cached sale details embed this record
+    await invalidate("sales")
     
-    return existing_customer
+    return updated_customer
 
 # Partial update of a customer's information
 @router.patch("/{customer_id}", response_model=Customer, status_code=status.HTTP_200_OK)
-def update_customer_partially(
+async def update_customer_partially(
     session: DatabaseSession,
-    customer_id: Annotated[str, Path(description="ID of the customer to partially update")],
+    customer_id: Annotated[int, Path(description="ID of the customer to partially update")],
     customer: Customer,
 ):
-    existing_customer = session.get(Customer, customer_id)
-    if not existing_customer:
+    updated_data = validate_partial(Customer, customer)
+    updated_customer = await update_returning(
+        session, Customer, customer_id, updated_data
+    )
+    if updated_customer is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"Customer with ID {customer_id} not found"
         )
     
-    updated_data = customer.model_dump(exclude_unset=True)
-    existing_customer.sqlmodel_update(updated_data)
-    session.add(existing_customer)
-    session.commit()
-    session.refresh(existing_customer)
+    await session.commit()
+    await invalidate("customers")
+    # Cached sale details embed this record
+    await invalidate("sales")
     
-    return existing_customer
+    return updated_customer
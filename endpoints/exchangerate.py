@@ -1,115 +1,166 @@
+from datetime import date
 from typing import Annotated
-from fastapi import APIRouter, HTTPException, status, Response, Depends, Query, Path
-
-from config.env import get_session
-from db.models import ExchangeRate
-from sqlmodel import Session, select
-
-# Dependency injection for database session
-DatabaseSession = Annotated[Session, Depends(get_session)]
-
-# Initializing API router with relevant configurations
-router = APIRouter(
-    prefix="/exchangerates",
-    tags=["ExchangeRate"],
-    responses={
-        status.HTTP_201_CREATED: {"description": "Successfully created the requested resource"},
-        status.HTTP_404_NOT_FOUND: {"description": "Resource not found"},
-        status.HTTP_500_INTERNAL_SERVER_ERROR: {"description": "An error occurred on the server"},
-    },
-)
+from fastapi import HTTPException, status, Response, Query, Path
+
+from config.cache import LONG_EXPIRE, LONG_MAX_AGE, cache_control, http_cache, invalidate, model_coder
+from db.models import ExchangeRate, ExchangeRateListItem, Page
+from endpoints._base import DatabaseSession, make_router, update_returning
+from endpoints.validation import validate_body, validate_partial
+from fastapi_cache.decorator import cache
+from sqlalchemy import insert, lambda_stmt
+from sqlalchemy.orm import raiseload
+from sqlmodel import select
+
+# Setting up the API router
+router = make_router("exchangerates", "ExchangeRate")
 
 # ------ CRUD Operations ------
 
 # ------ Create a new exchange rate record ------
 @router.post("/", response_model=ExchangeRate, summary="Add a new exchange rate entry to the database")
-def add_exchange_rate(exchange_rate: ExchangeRate, session: DatabaseSession):
+async def add_exchange_rate(exchange_rate: ExchangeRate, session: DatabaseSession):
+    exchange_rate = validate_body(ExchangeRate, exchange_rate)
     try:
         session.add(exchange_rate)
-        session.commit()
-        session.refresh(exchange_rate)
+        await session.commit()
+        await invalidate("exchangerates")
         return exchange_rate
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Error occurred: {error}")
 
 
+# ------ Create exchange rate records in bulk ------
+@router.post("/bulk", response_model=dict, summary="Add several exchange rate entries to the database in a single transaction")
+async def add_exchange_rates_bulk(exchange_rates: list[ExchangeRate], session: DatabaseSession):
+    if not exchange_rates:
+        return {"inserted": 0}
+    rows = [validate_body(ExchangeRate, exchange_rate).model_dump() for exchange_rate in exchange_rates]
+    try:
+        async with session.begin():
+            await session.exec(insert(ExchangeRate), params=rows)
+        await invalidate("exchangerates")
+        return {"inserted": len(exchange_rates)}
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Error occurred: {error}")
+
+
 # ------ Retrieve exchange rate records ------
 
+# List query built once as a cached lambda statement; each request only
+# binds its offset and limit into it
+_list_exchange_rates_query = lambda_stmt(
+    lambda: select(
+        ExchangeRate.Date, ExchangeRate.Currency, ExchangeRate.Exchange
+    ).options(raiseload("*"))
+)
+
 # Fetch a list of exchange rate records
-@router.get("/", response_model=dict, summary="Retrieve a list of exchange rates")
-def list_exchange_rates(
+@router.get("/", response_model=Page[ExchangeRateListItem], summary="Retrieve a list of exchange rates")
+@cache_control(max_age=LONG_MAX_AGE)
+@cache(expire=LONG_EXPIRE, namespace="exchangerates")
+async def list_exchange_rates(
     session: DatabaseSession,
     response: Response,
     offset: Annotated[int, Query(description="Number of records to skip")] = 0,
-    limit: Annotated[int, Query(le=10, description="Maximum number of records to fetch")] = 5,
+    limit: Annotated[int, Query(le=100, description="Maximum number of records to fetch")] = 5,
 ):
-    exchange_rate_query = select(ExchangeRate).offset(offset).limit(limit)
-    result_set = session.exec(exchange_rate_query)
-    exchange_rate_list = result_set.all()
+    exchange_rate_query = _list_exchange_rates_query + (lambda query: query.offset(offset).limit(limit))
+    result_set = await session.exec(exchange_rate_query)
+    exchange_rate_list = result_set.mappings().all()
     
     return {"data": exchange_rate_list, "count": len(exchange_rate_list)}
 
-# Retrieve details of a specific exchange rate by currency
-@router.get("/{currency}", response_model=ExchangeRate, summary="Retrieve details of an exchange rate using currency")
-def fetch_exchange_rate_by_currency(
+# Retrieve the most recent exchange rate of a currency
+@router.get("/{currency}", response_model=ExchangeRate, summary="Retrieve the latest exchange rate of a currency")
+@http_cache(ExchangeRate, max_age=LONG_MAX_AGE)
+@cache(expire=LONG_EXPIRE, namespace="exchangerates", coder=model_coder(ExchangeRate))
+async def fetch_exchange_rate_by_currency(
     session: DatabaseSession,
-    currency: Annotated[str, Path(description="Unique identifier of the exchange rate")],
+    currency: Annotated[str, Path(description="Currency code of the exchange rate")],
     response: Response,
 ):
-    response.headers["Cache-Control"] = "no-cache"
-    
-    exchange_rate_query = select(ExchangeRate).where(ExchangeRate.Currency == currency)
-    result_set = session.exec(exchange_rate_query)
-    exchange_rate_details = result_set.fetchall()
+    # Served by the (Currency, Date) index, so only one row is read
+    exchange_rate_query = (
+        select(ExchangeRate)
+        .where(ExchangeRate.Currency == currency)
+        .order_by(ExchangeRate.Date.desc())
+        .limit(1)
+    )
+    result_set = await session.exec(exchange_rate_query)
+    exchange_rate_details = result_set.first()
     
-    if not exchange_rate_details:
+    if exchange_rate_details is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"Exchange rate with currency {currency} not found"
         )
     
-    return exchange_rate_details[0].model_dump()
+    return exchange_rate_details
+
+# Retrieve the exchange rate of a currency on a given date
+@router.get("/{currency}/{rate_date}", response_model=ExchangeRate, summary="Retrieve details of an exchange rate using currency and date")
+@http_cache(ExchangeRate, max_age=LONG_MAX_AGE)
+@cache(expire=LONG_EXPIRE, namespace="exchangerates", coder=model_coder(ExchangeRate))
+async def fetch_exchange_rate_by_currency_and_date(
+    session: DatabaseSession,
+    currency: Annotated[str, Path(description="Currency code of the exchange rate")],
+    rate_date: Annotated[date, Path(description="Date of the exchange rate (YYYY-MM-DD)")],
+    response: Response,
+):
+    exchange_rate_details = await session.get(ExchangeRate, (rate_date, currency))
+    
+    if exchange_rate_details is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Exchange rate with currency {currency} on {rate_date} not found",
+        )
+    
+    return exchange_rate_details
 
 
 # ------ Update exchange rate records ------
 
 # Full update of an exchange rate's information
-@router.put("/{currency}", response_model=ExchangeRate, status_code=status.HTTP_200_OK)
-def modify_exchange_rate(
+@router.put("/{currency}/{rate_date}", response_model=ExchangeRate, status_code=status.HTTP_200_OK)
+async def modify_exchange_rate(
     session: DatabaseSession,
     currency: Annotated[str, Path(description="Currency identifier of the exchange rate to update")],
+    rate_date: Annotated[date, Path(description="Date of the exchange rate to update")],
     exchange_rate: ExchangeRate,
 ):
-    existing_exchange_rate = session.get(ExchangeRate, currency)
-    if not existing_exchange_rate:
+    updated_data = validate_body(ExchangeRate, exchange_rate).model_dump()
+    updated_exchange_rate = await update_returning(
+        session, ExchangeRate, (rate_date, currency), updated_data
+    )
+    if updated_exchange_rate is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Exchange rate with currency {currency} not found"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Exchange rate with currency {currency} on {rate_date} not found",
         )
     
-    updated_data = exchange_rate.model_dump()
-    existing_exchange_rate.sqlmodel_update(updated_data)
-    session.add(existing_exchange_rate)
-    session.commit()
-    session.refresh(existing_exchange_rate)
+    await session.commit()
+    await invalidate("exchangerates")
     
-    return existing_exchange_rate
+    return updated_exchange_rate
 
 # Partial update of an exchange rate's information
-@router.patch("/{currency}", response_model=ExchangeRate, status_code=status.HTTP_200_OK)
-def update_exchange_rate_partially(
+@router.patch("/{currency}/{rate_date}", response_model=ExchangeRate, status_code=status.HTTP_200_OK)
+async def update_exchange_rate_partially(
     session: DatabaseSession,
     currency: Annotated[str, Path(description="Currency identifier of the exchange rate to partially update")],
+    rate_date: Annotated[date, Path(description="Date of the exchange rate to partially update")],
     exchange_rate: ExchangeRate,
 ):
-    existing_exchange_rate = session.get(ExchangeRate, currency)
-    if not existing_exchange_rate:
+    updated_data = validate_partial(ExchangeRate, exchange_rate)
+    updated_exchange_rate = await update_returning(
+        session, ExchangeRate, (rate_date, currency), updated_data
+    )
+    if updated_exchange_rate is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Exchange rate with currency {currency} not found"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Exchange rate with currency {currency} on {rate_date} not found",
         )
     
-    updated_data = exchange_rate.model_dump(exclude_unset=True)
-    existing_exchange_rate.sqlmodel_update(updated_data)
-    session.add(existing_exchange_rate)
-    session.commit()
-    session.refresh(existing_exchange_rate)
+    await session.commit()
+    await invalidate("exchangerates")
     
-    return existing_exchange_rate
+    return updated_exchange_rate
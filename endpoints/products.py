@@ -1,115 +1,137 @@
 from typing import Annotated
-from fastapi import APIRouter, HTTPException, status, Response, Depends, Query, Path
+from fastapi import HTTPException, status, Response, Query, Path
 
-from config.env import get_session
-from db.models import Product
-from sqlmodel import Session, select
+from config.cache import LONG_EXPIRE, LONG_MAX_AGE, cache_control, http_cache, invalidate, model_coder
+from db.models import Product, ProductListItem, Page
+from endpoints._base import DatabaseSession, make_router, update_returning
+from endpoints.validation import validate_body, validate_partial
+from fastapi_cache.decorator import cache
+from sqlalchemy import insert, lambda_stmt
+from sqlalchemy.orm import raiseload
+from sqlmodel import select
 
-# Dependency injection for database session
-DatabaseSession = Annotated[Session, Depends(get_session)]
-
-# Configuring the API router with necessary settings
-router = APIRouter(
-    prefix="/products",
-    tags=["Products"],
-    responses={
-        status.HTTP_201_CREATED: {"description": "Successfully created the requested product"},
-        status.HTTP_404_NOT_FOUND: {"description": "Product not found"},
-        status.HTTP_500_INTERNAL_SERVER_ERROR: {"description": "An error occurred on the server"},
-    },
-)
+# Setting up the API router
+router = make_router("products", "Products")
 
 # ------ CRUD Operations ------
 
 # ------ Create a new product record ------
 @router.post("/", response_model=Product, summary="Add a new product entry to the database")
-def add_product(product: Product, session: DatabaseSession):
+async def add_product(product: Product, session: DatabaseSession):
+    product = validate_body(Product, product)
     try:
         session.add(product)
-        session.commit()
-        session.refresh(product)
+        await session.commit()
+        await invalidate("products")
         return product
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Error occurred: {error}")
 
 
+# ------ Create product records in bulk ------
+@router.post("/bulk", response_model=dict, summary="Add several product entries to the database in a single transaction")
+async def add_products_bulk(products: list[Product], session: DatabaseSession):
+    if not products:
+        return {"inserted": 0}
+    rows = [validate_body(Product, product).model_dump() for product in products]
+    try:
+        async with session.begin():
+            await session.exec(insert(Product), params=rows)
+        await invalidate("products")
+        return {"inserted": len(products)}
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Error occurred: {error}")
+
+
 # ------ Retrieve product records ------
 
+# List query built once as a cached lambda statement; each request only
+# binds its offset and limit into it
+_list_products_query = lambda_stmt(
+    lambda: select(
+        Product.ProductKey, Product.ProductName, Product.Brand, Product.Category, Product.UnitPriceUSD
+    ).options(raiseload("*"))
+)
+
 # Fetch a list of product records
-@router.get("/", response_model=dict, summary="Retrieve a list of products")
-def list_products(
+@router.get("/", response_model=Page[ProductListItem], summary="Retrieve a list of products")
+@cache_control(max_age=LONG_MAX_AGE)
+@cache(expire=LONG_EXPIRE, namespace="products")
+async def list_products(
     session: DatabaseSession,
     response: Response,
     offset: Annotated[int, Query(description="Number of records to skip")] = 0,
-    limit: Annotated[int, Query(le=10, description="Maximum number of records to fetch")] = 5,
+    limit: Annotated[int, Query(le=100, description="Maximum number of records to fetch")] = 5,
 ):
-    product_query = select(Product).offset(offset).limit(limit)
-    result_set = session.exec(product_query)
-    product_list = result_set.all()
+    product_query = _list_products_query + (lambda query: query.offset(offset).limit(limit))
+    result_set = await session.exec(product_query)
+    product_list = result_set.mappings().all()
     
     return {"data": product_list, "count": len(product_list)}
 
 # Retrieve details of a specific product by ID
 @router.get("/{product_id}", response_model=Product, summary="Retrieve details of a product using its ID")
-def fetch_product_by_id(
+@http_cache(Product, max_age=LONG_MAX_AGE)
+@cache(expire=LONG_EXPIRE, namespace="products", coder=model_coder(Product))
+async def fetch_product_by_id(
     session: DatabaseSession,
-    product_id: Annotated[str, Path(description="Unique identifier of the product")],
+    product_id: Annotated[int, Path(description="Unique identifier of the product")],
     response: Response,
 ):
-    response.headers["Cache-Control"] = "no-cache"
-    
-    product_query = select(Product).where(Product.ProductKey == product_id)
-    result_set = session.exec(product_query)
-    product_details = result_set.fetchall()
+    product_details = await session.get(Product, product_id)
     
-    if not product_details:
+    if product_details is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {product_id} not found"
         )
     
-    return product_details[0].model_dump()
+    return product_details
 
 
 # ------ Update product records ------
 
 # Full update of a product's information
 @router.put("/{product_id}", response_model=Product, status_code=status.HTTP_200_OK)
-def modify_product(
+async def modify_product(
     session: DatabaseSession,
-    product_id: Annotated[str, Path(description="Product ID to update")],
+    product_id: Annotated[int, Path(description="Product ID to update")],
     product: Product,
 ):
-    existing_product = session.get(Product, product_id)
-    if not existing_product:
+    updated_data = validate_body(Product, product).model_dump()
+    updated_product = await update_returning(
+        session, Product, product_id, updated_data
+    )
+    if updated_product is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {product_id} not found"
         )
     
-    updated_data = product.model_dump()
-    existing_product.sqlmodel_update(updated_data)
-    session.add(existing_product)
-    session.commit()
-    session.refresh(existing_product)
+    await session.commit()
+    await invalidate("products")
+    # Cached sale details embed this record
+    await invalidate("sales")
     
-    return existing_product
+    return updated_product
 
 # Partial update of a product's information
 @router.patch("/{product_id}", response_model=Product, status_code=status.HTTP_200_OK)
-def update_product_partially(
+async def update_product_partially(
     session: DatabaseSession,
-    product_id: Annotated[str, Path(description="Product ID to partially update")],
+    product_id: Annotated[int, Path(description="Product ID to partially update")],
     product: Product,
 ):
-    existing_product = session.get(Product, product_id)
-    if not existing_product:
+    updated_data = validate_partial(Product, product)
+    updated_product = await update_returning(
+        session, Product, product_id, updated_data
+    )
+    if updated_product is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {product_id} not found"
         )
     
-    updated_data = product.model_dump(exclude_unset=True)
-    existing_product.sqlmodel_update(updated_data)
-    session.add(existing_product)
-    session.commit()
-    session.refresh(existing_product)
+    await session.commit()
+    await invalidate("products")
+    # Cached sale details embed this record
+    await invalidate("sales")
     
-    return existing_product
+    return updated_product
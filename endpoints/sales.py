@@ -1,115 +1,158 @@
 from typing import Annotated
-from fastapi import APIRouter, HTTPException, status, Response, Depends, Query, Path
-
-from config.env import get_session
-from db.models import Sale
-from sqlmodel import Session, select
-
-# Dependency injection for database session
-DatabaseSession = Annotated[Session, Depends(get_session)]
-
-# Setting up API router with configurations
-router = APIRouter(
-    prefix="/sales",
-    tags=["Sales"],
-    responses={
-        status.HTTP_201_CREATED: {"description": "Successfully created the requested sale"},
-        status.HTTP_404_NOT_FOUND: {"description": "Sale not found"},
-        status.HTTP_500_INTERNAL_SERVER_ERROR: {"description": "An internal server error occurred"},
-    },
-)
+import orjson
+from fastapi import HTTPException, status, Response, Query, Path
+from fastapi.responses import StreamingResponse
+
+from config.cache import SHORT_EXPIRE, SHORT_MAX_AGE, cache_control, http_cache, invalidate, model_coder
+from config.env import SESSION_FACTORY
+from db.models import Sale, SaleDetails, SaleListItem, Page
+from endpoints._base import DatabaseSession, make_router, update_returning
+from endpoints.validation import validate_body, validate_partial
+from fastapi_cache.decorator import cache
+from sqlalchemy import insert, lambda_stmt
+from sqlalchemy.orm import joinedload, raiseload
+from sqlmodel import select
+
+# Setting up the API router
+router = make_router("sales", "Sales")
 
 # ------ CRUD Operations ------
 
 # ------ Create a new sale record ------
 @router.post("/", response_model=Sale, summary="Add a new sale entry to the database")
-def add_sale(sale: Sale, session: DatabaseSession):
+async def add_sale(sale: Sale, session: DatabaseSession):
+    sale = validate_body(Sale, sale)
     try:
         session.add(sale)
-        session.commit()
-        session.refresh(sale)
+        await session.commit()
+        await invalidate("sales")
         return sale
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Error occurred: {error}")
 
 
+# ------ Create sale records in bulk ------
+@router.post("/bulk", response_model=dict, summary="Add several sale entries to the database in a single transaction")
+async def add_sales_bulk(sales: list[Sale], session: DatabaseSession):
+    if not sales:
+        return {"inserted": 0}
+    rows = [validate_body(Sale, sale).model_dump() for sale in sales]
+    try:
+        async with session.begin():
+            await session.exec(insert(Sale), params=rows)
+        await invalidate("sales")
+        return {"inserted": len(sales)}
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Error occurred: {error}")
+
+
 # ------ Retrieve sale records ------
 
+# List query built once as a cached lambda statement; each request only
+# binds its offset and limit into it
+_list_sales_query = lambda_stmt(
+    lambda: select(
+        Sale.OrderNumber, Sale.LineItem, Sale.OrderDate, Sale.CustomerKey, Sale.ProductKey, Sale.Quantity
+    ).options(raiseload("*"))
+)
+
 # Fetch a list of sale records
-@router.get("/", response_model=dict, summary="Retrieve a list of sales")
-def list_sales(
+@router.get("/", response_model=Page[SaleListItem], summary="Retrieve a list of sales")
+@cache_control(max_age=SHORT_MAX_AGE)
+@cache(expire=SHORT_EXPIRE, namespace="sales")
+async def list_sales(
     session: DatabaseSession,
     response: Response,
     offset: Annotated[int, Query(description="Number of records to skip")] = 0,
-    limit: Annotated[int, Query(le=10, description="Maximum number of records to fetch")] = 5,
+    limit: Annotated[int, Query(le=100, description="Maximum number of records to fetch")] = 5,
 ):
-    sale_query = select(Sale).offset(offset).limit(limit)
-    result_set = session.exec(sale_query)
-    sale_list = result_set.all()
+    sale_query = _list_sales_query + (lambda query: query.offset(offset).limit(limit))
+    result_set = await session.exec(sale_query)
+    sale_list = result_set.mappings().all()
     
     return {"data": sale_list, "count": len(sale_list)}
 
-# Retrieve details of a specific sale by ID
-@router.get("/{sale_id}", response_model=Sale, summary="Retrieve details of a sale using its ID")
-def fetch_sale_by_id(
+# Stream every sale record as newline-delimited JSON
+@router.get("/export", summary="Export all sales as newline-delimited JSON")
+async def export_sales():
+    async def generate_ndjson():
+        # The request's session is closed before the body is streamed,
+        # so the export opens its own
+        async with SESSION_FACTORY() as session:
+            sale_query = select(*Sale.__table__.columns).execution_options(yield_per=500)
+            result_set = await session.stream(sale_query)
+            async for sale in result_set.mappings():
+                yield orjson.dumps(dict(sale)) + b"\n"
+
+    return StreamingResponse(generate_ndjson(), media_type="application/x-ndjson")
+
+# Retrieve details of a specific sale line by order number and line item
+@router.get("/{sale_id}/{line_item}", response_model=SaleDetails, summary="Retrieve details of a sale line, with its customer, product and store, using its order number and line item")
+@http_cache(SaleDetails, max_age=SHORT_MAX_AGE)
+@cache(expire=SHORT_EXPIRE, namespace="sales", coder=model_coder(SaleDetails))
+async def fetch_sale_by_id(
     session: DatabaseSession,
-    sale_id: Annotated[str, Path(description="Unique identifier of the sale")],
+    sale_id: Annotated[int, Path(description="Order number of the sale")],
+    line_item: Annotated[int, Path(description="Line item within the order")],
     response: Response,
 ):
-    response.headers["Cache-Control"] = "no-cache"
-    
-    sale_query = select(Sale).where(Sale.OrderNumber == sale_id)
-    result_set = session.exec(sale_query)
-    sale_details = result_set.fetchall()
+    # The related rows are many-to-one, so joining them in keeps this to a single query
+    sale_details = await session.get(
+        Sale,
+        (sale_id, line_item),
+        options=[joinedload(Sale.customer), joinedload(Sale.product), joinedload(Sale.store), raiseload("*")],
+    )
     
-    if not sale_details:
+    if sale_details is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Sale with ID {sale_id} not found"
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Sale {sale_id} line {line_item} not found"
         )
     
-    return sale_details[0].model_dump()
+    return sale_details
 
 
 # ------ Update sale records ------
 
 # Full update of a sale's information
-@router.put("/{sale_id}", response_model=Sale, status_code=status.HTTP_200_OK)
-def modify_sale(
+@router.put("/{sale_id}/{line_item}", response_model=Sale, status_code=status.HTTP_200_OK)
+async def modify_sale(
     session: DatabaseSession,
-    sale_id: Annotated[str, Path(description="Sale ID to update")],
+    sale_id: Annotated[int, Path(description="Order number of the sale to update")],
+    line_item: Annotated[int, Path(description="Line item of the sale to update")],
     sale: Sale,
 ):
-    existing_sale = session.get(Sale, sale_id)
-    if not existing_sale:
+    updated_data = validate_body(Sale, sale).model_dump()
+    updated_sale = await update_returning(
+        session, Sale, (sale_id, line_item), updated_data
+    )
+    if updated_sale is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Sale with ID {sale_id} not found"
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Sale {sale_id} line {line_item} not found"
         )
     
-    updated_data = sale.model_dump()
-    existing_sale.sqlmodel_update(updated_data)
-    session.add(existing_sale)
-    session.commit()
-    session.refresh(existing_sale)
+    await session.commit()
+    await invalidate("sales")
     
-    return existing_sale
+    return updated_sale
 
 # Partial update of a sale's information
-@router.patch("/{sale_id}", response_model=Sale, status_code=status.HTTP_200_OK)
-def update_sale_partially(
+@router.patch("/{sale_id}/{line_item}", response_model=Sale, status_code=status.HTTP_200_OK)
+async def update_sale_partially(
     session: DatabaseSession,
-    sale_id: Annotated[str, Path(description="Sale ID to partially update")],
+    sale_id: Annotated[int, Path(description="Order number of the sale to partially update")],
+    line_item: Annotated[int, Path(description="Line item of the sale to partially update")],
     sale: Sale,
 ):
-    existing_sale = session.get(Sale, sale_id)
-    if not existing_sale:
+    updated_data = validate_partial(Sale, sale)
+    updated_sale = await update_returning(
+        session, Sale, (sale_id, line_item), updated_data
+    )
+    if updated_sale is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Sale with ID {sale_id} not found"
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Sale {sale_id} line {line_item} not found"
         )
     
-    updated_data = sale.model_dump(exclude_unset=True)
-    existing_sale.sqlmodel_update(updated_data)
-    session.add(existing_sale)
-    session.commit()
-    session.refresh(existing_sale)
+    await session.commit()
+    await invalidate("sales")
     
-    return existing_sale
+    return updated_sale
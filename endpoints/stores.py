@@ -1,115 +1,135 @@
 from typing import Annotated
-from fastapi import APIRouter, HTTPException, status, Response, Depends, Query, Path
+from fastapi import HTTPException, status, Response, Query, Path
 
-from config.env import get_session
-from db.models import Store
-from sqlmodel import Session, select
+from config.cache import LONG_EXPIRE, LONG_MAX_AGE, cache_control, http_cache, invalidate, model_coder
+from db.models import Store, StoreListItem, Page
+from endpoints._base import DatabaseSession, make_router, update_returning
+from endpoints.validation import validate_body, validate_partial
+from fastapi_cache.decorator import cache
+from sqlalchemy import insert, lambda_stmt
+from sqlalchemy.orm import raiseload
+from sqlmodel import select
 
-# Dependency injection for database session
-DatabaseSession = Annotated[Session, Depends(get_session)]
-
-# Setting up API router with configurations
-router = APIRouter(
-    prefix="/stores",
-    tags=["Stores"],
-    responses={
-        status.HTTP_201_CREATED: {"description": "Successfully created the requested store"},
-        status.HTTP_404_NOT_FOUND: {"description": "Store not found"},
-        status.HTTP_500_INTERNAL_SERVER_ERROR: {"description": "An internal server error occurred"},
-    },
-)
+# Setting up the API router
+router = make_router("stores", "Stores")
 
 # ------ CRUD Operations ------
 
 # ------ Create a new store record ------
 @router.post("/", response_model=Store, summary="Add a new store entry to the database")
-def add_store(store: Store, session: DatabaseSession):
+async def add_store(store: Store, session: DatabaseSession):
+    store = validate_body(Store, store)
     try:
         session.add(store)
-        session.commit()
-        session.refresh(store)
+        await session.commit()
+        await invalidate("stores")
         return store
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Error occurred: {error}")
 
 
+# ------ Create store records in bulk ------
+@router.post("/bulk", response_model=dict, summary="Add several store entries to the database in a single transaction")
+async def add_stores_bulk(stores: list[Store], session: DatabaseSession):
+    if not stores:
+        return {"inserted": 0}
+    rows = [validate_body(Store, store).model_dump() for store in stores]
+    try:
+        async with session.begin():
+            await session.exec(insert(Store), params=rows)
+        await invalidate("stores")
+        return {"inserted": len(stores)}
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Error occurred: {error}")
+
+
 # ------ Retrieve store records ------
 
+# List query built once as a cached lambda statement; each request only
+# binds its offset and limit into it
+_list_stores_query = lambda_stmt(
+    lambda: select(Store.StoreKey, Store.Country, Store.State).options(raiseload("*"))
+)
+
 # Fetch a list of store records
-@router.get("/", response_model=dict, summary="Retrieve a list of stores")
-def list_stores(
+@router.get("/", response_model=Page[StoreListItem], summary="Retrieve a list of stores")
+@cache_control(max_age=LONG_MAX_AGE)
+@cache(expire=LONG_EXPIRE, namespace="stores")
+async def list_stores(
     session: DatabaseSession,
     response: Response,
     offset: Annotated[int, Query(description="Number of records to skip")] = 0,
-    limit: Annotated[int, Query(le=10, description="Maximum number of records to fetch")] = 5,
+    limit: Annotated[int, Query(le=100, description="Maximum number of records to fetch")] = 5,
 ):
-    store_query = select(Store).offset(offset).limit(limit)
-    result_set = session.exec(store_query)
-    store_list = result_set.all()
+    store_query = _list_stores_query + (lambda query: query.offset(offset).limit(limit))
+    result_set = await session.exec(store_query)
+    store_list = result_set.mappings().all()
     
     return {"data": store_list, "count": len(store_list)}
 
 # Retrieve details of a specific store by ID
 @router.get("/{store_id}", response_model=Store, summary="Retrieve details of a store using its ID")
-def fetch_store_by_id(
+@http_cache(Store, max_age=LONG_MAX_AGE)
+@cache(expire=LONG_EXPIRE, namespace="stores", coder=model_coder(Store))
+async def fetch_store_by_id(
     session: DatabaseSession,
-    store_id: Annotated[str, Path(description="Unique identifier of the store")],
+    store_id: Annotated[int, Path(description="Unique identifier of the store")],
     response: Response,
 ):
-    response.headers["Cache-Control"] = "no-cache"
-    
-    store_query = select(Store).where(Store.StoreKey == store_id)
-    result_set = session.exec(store_query)
-    store_details = result_set.fetchall()
+    store_details = await session.get(Store, store_id)
     
-    if not store_details:
+    if store_details is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"Store with ID {store_id} not found"
         )
     
-    return store_details[0].model_dump()
+    return store_details
 
 
 # ------ Update store records ------
 
 # Full update of a store's information
 @router.put("/{store_id}", response_model=Store, status_code=status.HTTP_200_OK)
-def modify_store(
+async def modify_store(
     session: DatabaseSession,
-    store_id: Annotated[str, Path(description="Store ID to update")],
+    store_id: Annotated[int, Path(description="Store ID to update")],
     store: Store,
 ):
-    existing_store = session.get(Store, store_id)
-    if not existing_store:
+    updated_data = validate_body(Store, store).model_dump()
+    updated_store = await update_returning(
+        session, Store, store_id, updated_data
+    )
+    if updated_store is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"Store with ID {store_id} not found"
         )
     
-    updated_data = store.model_dump()
-    existing_store.sqlmodel_update(updated_data)
-    session.add(existing_store)
-    session.commit()
-    session.refresh(existing_store)
+    await session.commit()
+    await invalidate("stores")
+    # Cached sale details embed this record
+    await invalidate("sales")
     
-    return existing_store
+    return updated_store
 
 # Partial update of a store's information
 @router.patch("/{store_id}", response_model=Store, status_code=status.HTTP_200_OK)
-def update_store_partially(
+async def update_store_partially(
     session: DatabaseSession,
-    store_id: Annotated[str, Path(description="Store ID to partially update")],
+    store_id: Annotated[int, Path(description="Store ID to partially update")],
     store: Store,
 ):
-    existing_store = session.get(Store, store_id)
-    if not existing_store:
+    updated_data = validate_partial(Store, store)
+    updated_store = await update_returning(
+        session, Store, store_id, updated_data
+    )
+    if updated_store is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=f"Store with ID {store_id} not found"
         )
     
-    updated_data = store.model_dump(exclude_unset=True)
-    existing_store.sqlmodel_update(updated_data)
-    session.add(existing_store)
-    session.commit()
-    session.refresh(existing_store)
+    await session.commit()
+    await invalidate("stores")
+    # Cached sale details embed this record
+    await invalidate("sales")
     
-    return existing_store
+    return updated_store
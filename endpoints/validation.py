@@ -0,0 +1,40 @@
+from functools import lru_cache
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from sqlmodel import SQLModel
+
+
+# Table models are not validated when FastAPI builds them from a request body,
+# so values such as dates or decimals arrive as plain JSON strings. Running
+# them through model_validate converts them to their declared types. Only the
+# column values are passed on: validating the instance itself would copy its
+# unset relationships as explicit None, which SQLAlchemy then writes back over
+# the foreign key columns on flush.
+def validate_body(model, data):
+    if isinstance(data, SQLModel):
+        data = data.model_dump(warnings=False)
+    try:
+        return model.model_validate(data)
+    except ValidationError as error:
+        raise RequestValidationError(error.errors()) from error
+
+
+@lru_cache
+def _field_adapter(model, name):
+    return TypeAdapter(model.model_fields[name].annotation)
+
+
+# Validates only the fields set in a partial update body, converting each one
+# to its declared type without needing the rest of the record. The body still
+# holds the raw JSON values, which the model's serializer would warn about
+# (e.g. a string in a Decimal field), so warnings are off while reading them.
+def validate_partial(model, body):
+    values, errors = {}, []
+    for name, value in body.model_dump(exclude_unset=True, warnings=False).items():
+        try:
+            values[name] = _field_adapter(model, name).validate_python(value)
+        except ValidationError as error:
+            errors.extend({**detail, "loc": (name, *detail["loc"])} for detail in error.errors())
+    if errors:
+        raise RequestValidationError(errors)
+    return values
@@ -1,6 +1,15 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from contextlib import asynccontextmanager
+import orjson
+from fastapi import FastAPI, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.templating import Jinja2Templates
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from redis import asyncio as aioredis
+from config.cache import CACHE_PREFIX, REDIS_URL, OrjsonCoder, request_key_builder
+from config.env import ENGINE
 from endpoints import customers
 from endpoints import products
 from endpoints import sales
@@ -20,6 +29,20 @@ It allows to:
 Further Information is below 👇
 """
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    redis = aioredis.from_url(REDIS_URL)
+    FastAPICache.init(
+        RedisBackend(redis), prefix=CACHE_PREFIX, coder=OrjsonCoder, key_builder=request_key_builder
+    )
+    # The home page has no dynamic content, so it is rendered only once
+    app.state.home_html = templates.get_template("home.html").render().encode()
+    # Routes are fixed once the app starts, so the schema is serialized once
+    app.state.openapi_bytes = orjson.dumps(app.openapi())
+    yield
+    await redis.close()
+    await ENGINE.dispose()
+
 app = FastAPI(
     title="Global Electronics Retailer API",
     description=description,
@@ -32,16 +55,33 @@ app = FastAPI(
         "name": "Apache 2.0",
         "url": "https://www.apache.org/licenses/LICENSE-2.0.html",
     },
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+    # Served below from bytes built at startup, together with the docs pages
+    openapi_url=None,
 )
 
+# Rows repeat the same country, brand and category strings, so JSON bodies
+# compress well; tiny responses are not worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=4)
+
 templates = Jinja2Templates(directory="templates")
 
-app.include_router(customers.router)
-app.include_router(sales.router)
-app.include_router(stores.router)
-app.include_router(products.router)
-app.include_router(exchangerate.router)
+for module in (customers, sales, stores, products, exchangerate):
+    app.include_router(module.router)
 
 @app.get("/", response_class=HTMLResponse, include_in_schema=False)
-def home(request: Request):
-    return templates.TemplateResponse("home.html", {"request": request})
\ No newline at end of file
+async def home(request: Request):
+    return HTMLResponse(request.app.state.home_html)
+
+@app.get("/openapi.json", include_in_schema=False)
+async def openapi_json(request: Request):
+    return Response(content=request.app.state.openapi_bytes, media_type="application/json")
+
+@app.get("/docs", include_in_schema=False)
+async def swagger_ui():
+    return get_swagger_ui_html(openapi_url="/openapi.json", title=f"{app.title} - Swagger UI")
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc():
+    return get_redoc_html(openapi_url="/openapi.json", title=f"{app.title} - ReDoc")
\ No newline at end of file